@@ -3,7 +3,7 @@ import zipfile
 import streamlit as st
 from utils.tiler import tile_image
 from utils.masker import create_water_mask
-from model.predict import predict_water_body
+from model.predict import predict_water_body, warm_up_unet
 from io import BytesIO
 from PIL import Image
 import shutil
@@ -109,9 +109,9 @@ def handle_folder_upload(uploaded_folder):
     zip_buffer.seek(0)
     return zip_buffer
 
-def display_prediction(uploaded_image):
+def display_prediction(uploaded_image, use_unet=False):
     """Show prediction result for water body percentage."""
-    prediction, percentage = predict_water_body(uploaded_image)
+    prediction, percentage = predict_water_body(uploaded_image, use_unet=use_unet)
     st.image(prediction, caption="Predicted Mask 🌊", use_column_width=True)
     st.write(f"Water Body Percentage Detected: {percentage}% 🛰️")
 
@@ -130,5 +130,11 @@ if option == "Upload Folder for Preprocessing":
 
 elif option == "Upload Single Image for Prediction":
     uploaded_image = st.file_uploader("🖼️ Upload Single Satellite Image (.tiff)", type="tiff")
+    use_unet = st.checkbox("🧠 Refine with U-Net model")
     if uploaded_image:
-        display_prediction(uploaded_image)
+        display_prediction(uploaded_image, use_unet=use_unet)
+
+# The page is rendered, load the U-Net in the background so the first model prediction is fast.
+# Only when served by Streamlit: plain imports (e.g. the startup benchmark) should stay light.
+if st.runtime.exists():
+    warm_up_unet()
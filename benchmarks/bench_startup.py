@@ -0,0 +1,76 @@
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+HEAVY_MODULES = ['tensorflow', 'rasterio', 'cv2', 'matplotlib', 'streamlit']
+
+# Entry point module -> heavy modules it must NOT import at startup
+ENTRY_POINTS = {
+    'app': ['tensorflow', 'rasterio', 'cv2', 'matplotlib'],
+    'main': ['tensorflow', 'rasterio', 'cv2', 'matplotlib'],
+    'preprocess_tiles': ['tensorflow', 'rasterio', 'cv2', 'matplotlib', 'streamlit'],
+    'predict_batch': ['tensorflow', 'rasterio', 'cv2', 'matplotlib', 'streamlit'],
+    # The training loader subclasses the Keras Sequence, so only TensorFlow is expected there
+    'utils.loader': ['rasterio', 'cv2', 'matplotlib', 'streamlit'],
+    'utils.tiler': ['tensorflow', 'rasterio', 'cv2', 'matplotlib', 'streamlit'],
+    'utils.masker': ['tensorflow', 'rasterio', 'cv2', 'matplotlib', 'streamlit'],
+}
+
+# Runs in a fresh interpreter so nothing is already cached in sys.modules
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def measure(module, repeats):
+    """Median cold import time of a module and the heavy modules it pulled in"""
+    times = []
+    loaded = []
+    for _ in range(repeats):
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=PROJECT_ROOT, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        times.append(report['seconds'])
+        loaded = report['loaded']
+    return statistics.median(times), loaded
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of each entry point")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help="Fail if any entry point takes longer than this to import")
+    parser.add_argument('entry_points', nargs='*', default=list(ENTRY_POINTS))
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'entry point':<20}{'import (s)':>12}  heavy modules loaded")
+    for module in args.entry_points:
+        seconds, loaded = measure(module, args.repeats)
+        print(f"{module:<20}{seconds:>12.3f}  {', '.join(loaded) or '-'}")
+
+        unexpected = [m for m in loaded if m in ENTRY_POINTS.get(module, [])]
+        if unexpected:
+            failures.append(f"{module} imports {', '.join(unexpected)} at startup")
+        if args.max_seconds is not None and seconds > args.max_seconds:
+            failures.append(f"{module} took {seconds:.3f}s to import (limit {args.max_seconds}s)")
+
+    if failures:
+        print("\nStartup regressions:")
+        for failure in failures:
+            print(f"- {failure}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.tiler import tile_image, read_tile
+
+# (label, tile_image keyword arguments)
+CONFIGS = [
+    ('png', {'tile_format': 'png'}),
+    ('png level 1', {'tile_format': 'png', 'compression_level': 1}),
+    ('geotiff deflate', {'tile_format': 'geotiff', 'compress': 'deflate', 'predictor': 2}),
+    ('geotiff deflate level 1', {'tile_format': 'geotiff', 'compress': 'deflate', 'predictor': 2, 'compression_level': 1}),
+    ('geotiff lzw', {'tile_format': 'geotiff', 'compress': 'lzw', 'predictor': 2}),
+    ('geotiff zstd', {'tile_format': 'geotiff', 'compress': 'zstd', 'predictor': 2}),
+    ('geotiff zstd level 1', {'tile_format': 'geotiff', 'compress': 'zstd', 'predictor': 2, 'compression_level': 1}),
+    ('geotiff none', {'tile_format': 'geotiff', 'compress': 'none'}),
+    ('webp lossless', {'tile_format': 'webp'}),
+    ('webp lossless effort 0', {'tile_format': 'webp', 'compression_level': 0}),
+    ('npy', {'tile_format': 'npy'}),
+]
+
+def bench_config(image_paths, tile_size, options, work_dir):
+    """Tile every image with one writer config. Returns (encode_s, decode_s, bytes, tiles)"""
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    start = time.perf_counter()
+    tile_paths = []
+    for image_path in image_paths:
+        tile_paths.extend(tile_image(image_path, tile_size, work_dir, **options))
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for tile_path in tile_paths:
+        read_tile(tile_path)
+    decode_time = time.perf_counter() - start
+
+    total_bytes = sum(os.path.getsize(p) for p in tile_paths)
+    return encode_time, decode_time, total_bytes, len(tile_paths)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare encode/decode speed and size of tile output formats")
+    parser.add_argument('--input-dir', default='raw_satellite_images')
+    parser.add_argument('--limit', type=int, default=5, help="Number of scenes to tile")
+    parser.add_argument('--tile-size', type=int, default=256)
+    args = parser.parse_args()
+
+    image_paths = sorted(
+        os.path.join(args.input_dir, f) for f in os.listdir(args.input_dir) if f.lower().endswith(('.tif', '.tiff'))
+    )[:args.limit]
+    if not image_paths:
+        raise FileNotFoundError(f"No .tif/.tiff scenes found in: {args.input_dir}")
+
+    print(f"Tiling {len(image_paths)} scenes at {args.tile_size}px\n")
+    print(f"{'format':<26}{'tiles':>7}{'encode (s)':>12}{'decode (s)':>12}{'size (MB)':>12}")
+
+    work_root = tempfile.mkdtemp(prefix='tile_bench_')
+    try:
+        for label, options in CONFIGS:
+            try:
+                encode_time, decode_time, total_bytes, tiles = bench_config(
+                    image_paths, args.tile_size, options, os.path.join(work_root, 'tiles')
+                )
+            except ValueError as e:  # e.g. WebP cannot hold the scene's band count or dtype
+                print(f"{label:<26}  skipped: {e}")
+                continue
+            print(f"{label:<26}{tiles:>7}{encode_time:>12.3f}{decode_time:>12.3f}{total_bytes / 1e6:>12.2f}")
+    finally:
+        shutil.rmtree(work_root, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,11 @@
+import os
+import threading
 import numpy as np
 from PIL import Image
-from utils.masker import create_water_mask  # Import the create_water_mask function
+from utils.masker import create_water_mask, create_water_mask_from_array
+from utils.tiler import prepare_model_input
 import io
 import tempfile
-import matplotlib.pyplot as plt
 
 
 def preprocess_image(uploaded_image):
@@ -22,19 +24,26 @@ def save_uploaded_file(uploaded_file):
         f.write(uploaded_file.getvalue())
     return temp_file.name
 
-def predict_water_body(uploaded_image):
+def predict_water_body(uploaded_image, use_unet=False, cascade_bands=(2.0, 98.0)):
     """
     Predict the water body in the uploaded image using the water mask.
     This will also calculate the percentage of water in the image.
+    With use_unet, the mask comes from the U-Net, run only on tiles outside cascade_bands.
     """
     try:
         # Save the uploaded file temporarily
         temp_file_path = save_uploaded_file(uploaded_image)
 
+        if use_unet:
+            water_mask, _, _ = predict_scene(temp_file_path, load_unet(), cascade_bands=cascade_bands)
+            white_pixels = np.sum(water_mask == 255)
+            return water_mask, (white_pixels / water_mask.size) * 100
+
         # Generate the water mask using the masker.py function
         water_mask = create_water_mask(temp_file_path)
 
         # Visualize the water mask to ensure it's working correctly
+        import matplotlib.pyplot as plt  # Heavy import, deferred until a prediction is made
         plt.imshow(water_mask, cmap='gray')
         plt.title('Water Mask')
         plt.show()
@@ -57,3 +66,141 @@ def predict_water_body(uploaded_image):
 
 # Example usage:
 # prediction_mask, percentage = predict_water_body(uploaded_image)
+
+
+# ---------------------------------------------------------------------------
+# U-Net inference over whole scenes
+# ---------------------------------------------------------------------------
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(__file__), 'unet_model.h5')
+
+_model_cache = {}
+_model_lock = threading.Lock()
+_warm_up_threads = {}
+
+
+def load_unet(model_path=DEFAULT_MODEL_PATH):
+    """Load the trained U-Net once per process and reuse it"""
+    with _model_lock:  # A request arriving during warm-up waits for it instead of loading twice
+        if model_path not in _model_cache:
+            import tensorflow as tf  # Heavy import, only needed for model inference
+            _model_cache[model_path] = tf.keras.models.load_model(model_path, compile=False)
+        return _model_cache[model_path]
+
+def warm_up_unet(model_path=DEFAULT_MODEL_PATH):
+    """Start loading the U-Net in a background thread so the first prediction does not pay for it"""
+    thread = _warm_up_threads.get(model_path)
+    if model_path in _model_cache or (thread is not None and thread.is_alive()):
+        return thread
+
+    def _warm_up():
+        try:
+            load_unet(model_path)
+        except Exception as e:
+            print(f"Error warming up model {model_path}: {e}")
+
+    thread = threading.Thread(target=_warm_up, name='unet-warm-up', daemon=True)
+    _warm_up_threads[model_path] = thread
+    thread.start()
+    return thread
+
+def predict_tiles(model, tiles, batch_size=8, threshold=0.5):
+    """
+    Run the U-Net over a list of (H, W, C) tiles in batches.
+    Returns one binary mask (0=land, 255=water) per tile, at the tile's own size.
+    """
+    masks = []
+    input_size = model.input_shape[1]
+    for start in range(0, len(tiles), batch_size):
+        batch_tiles = tiles[start:start + batch_size]
+        batch = np.stack([prepare_model_input(tile, input_size) for tile in batch_tiles])
+        probs = model.predict(batch, verbose=0)[..., 0]
+        for tile, prob in zip(batch_tiles, probs):
+            mask = ((prob > threshold) * 255).astype(np.uint8)
+            height, width = tile.shape[:2]
+            if (height, width) != mask.shape:
+                mask = np.array(Image.fromarray(mask).resize((width, height), Image.NEAREST))
+            masks.append(mask)
+    return masks
+
+def predict_scene(image_path, model, tile_size=256, batch_size=8, cascade_bands=None, verify_cascade=False):
+    """
+    Predict a full-scene water mask by tiling the scene and running the U-Net per tile.
+    Returns (mask, profile, tile_stats) where profile is the source rasterio profile
+    and tile_stats holds the water percentage of every tile.
+
+    With cascade_bands=(land_max, water_min), tiles whose NDWI water percentage is
+    <= land_max or >= water_min keep the NDWI mask and only the remaining tiles go
+    to the U-Net. verify_cascade also runs the U-Net on the skipped tiles and records
+    the pixel agreement between the two masks, to check the bands are safe.
+    """
+    import rasterio
+    from rasterio.windows import Window
+
+    tile_stats = []
+    pending = []  # (stats, tile, ndwi_mask) waiting for the next U-Net batch
+
+    def write_tile_mask(stats, tile_mask):
+        y, x = stats['tile_y'], stats['tile_x']
+        mask[y:y + tile_mask.shape[0], x:x + tile_mask.shape[1]] = tile_mask
+        stats['water_percentage'] = float(np.mean(tile_mask == 255) * 100)
+
+    def flush():
+        unet_masks = predict_tiles(model, [tile for _, tile, _ in pending], batch_size=batch_size)
+        for (stats, _, ndwi_mask), unet_mask in zip(pending, unet_masks):
+            if stats['source'] == 'ndwi':
+                stats['agreement'] = float(np.mean(ndwi_mask == unet_mask) * 100)
+            else:
+                write_tile_mask(stats, unet_mask)
+        pending.clear()
+
+    # Tiles are read and predicted in batch_size groups so only the mask is held for the whole scene
+    with rasterio.open(image_path) as src:
+        profile = src.profile.copy()
+        mask = np.zeros((src.height, src.width), dtype=np.uint8)
+
+        for y in range(0, src.height, tile_size):
+            for x in range(0, src.width, tile_size):
+                window = Window(x, y, min(tile_size, src.width - x), min(tile_size, src.height - y))
+                tile = np.moveaxis(src.read(window=window), 0, -1)  # (C,H,W) → (H,W,C)
+                stats = {
+                    'tile_y': y,
+                    'tile_x': x,
+                    'tile_height': tile.shape[0],
+                    'tile_width': tile.shape[1],
+                    'water_percentage': None,
+                    'source': 'unet',
+                    'ndwi_water_percentage': None,
+                    'agreement': None,
+                }
+                tile_stats.append(stats)
+
+                ndwi_mask = None
+                if cascade_bands is not None:
+                    land_max, water_min = cascade_bands
+                    ndwi_mask = create_water_mask_from_array(tile)
+                    stats['ndwi_water_percentage'] = float(np.mean(ndwi_mask == 255) * 100)
+                    if stats['ndwi_water_percentage'] <= land_max or stats['ndwi_water_percentage'] >= water_min:
+                        stats['source'] = 'ndwi'
+                        write_tile_mask(stats, ndwi_mask)
+
+                # Only the ambiguous tiles (or, when verifying, every tile) go through the U-Net
+                if stats['source'] == 'unet' or verify_cascade:
+                    pending.append((stats, tile, ndwi_mask))
+                    if len(pending) >= batch_size:
+                        flush()
+
+        if pending:
+            flush()
+
+    return mask, profile, tile_stats
+
+def save_mask_geotiff(mask, profile, output_path):
+    """Write a single-band uint8 mask with the georeferencing of the source scene"""
+    import rasterio
+
+    mask_profile = profile.copy()
+    mask_profile.pop('photometric', None)  # RGB photometric is invalid for a single band
+    mask_profile.update(driver='GTiff', count=1, dtype='uint8', nodata=None, compress='deflate')
+    with rasterio.open(output_path, 'w', **mask_profile) as dst:
+        dst.write(mask, 1)
@@ -19,6 +19,7 @@ def verify_paths(config):
         config['train_mask_dir'],
         os.path.dirname(config['model_save_path'])
     ]
+    required_paths = [path for path in required_paths if path]  # No mask dir when labels are computed on the fly
     
     for path in required_paths:
         if not os.path.exists(path):
@@ -32,7 +33,8 @@ def train():
         'learning_rate': 1e-4,
         'tile_size': 256,
         'train_image_dir': os.path.join('dataset', 'images_tiled'),
-        'train_mask_dir': os.path.join('dataset', 'masks_tiled'),
+        'train_mask_dir': os.path.join('dataset', 'masks_tiled'),  # None: compute NDWI labels on the fly
+        'label_cache_size': 2048,  # Computed labels kept in memory when train_mask_dir is None
         'val_split': 0.2,
         'model_save_path': os.path.join('model', 'unet_model.h5')
     }
@@ -48,7 +50,8 @@ def train():
             mask_dir=config['train_mask_dir'],
             batch_size=config['batch_size'],
             tile_size=config['tile_size'],
-            shuffle=True
+            shuffle=True,
+            label_cache_size=config['label_cache_size']
         )
 
         # Split into train/validation
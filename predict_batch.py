@@ -0,0 +1,261 @@
+import os
+import csv
+import glob
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+from model.predict import DEFAULT_MODEL_PATH, load_unet, predict_scene, save_mask_geotiff
+
+TILE_FIELDS = ['scene', 'tile_y', 'tile_x', 'tile_height', 'tile_width', 'water_percentage',
+               'source', 'ndwi_water_percentage', 'agreement']
+SCENE_FIELDS = ['scene', 'tiles', 'water_percentage', 'tiles_skipped_fraction', 'cascade_agreement']
+
+# Per-worker state, set once by the pool initializer
+_worker = {}
+
+def _is_under(path, directory):
+    path = os.path.abspath(path)
+    return path == directory or path.startswith(directory + os.sep)
+
+def find_scenes(input_path, exclude_dir=None):
+    """
+    Resolve a directory or glob pattern into a sorted list of TIFF scenes.
+    Anything under exclude_dir (the output directory) is skipped, so our own masks are never picked up as scenes.
+    """
+    exclude_dir = os.path.abspath(exclude_dir) if exclude_dir else None
+    if os.path.isdir(input_path):
+        scenes = []
+        for root, dirs, files in os.walk(input_path):
+            if exclude_dir:
+                dirs[:] = [d for d in dirs if not _is_under(os.path.join(root, d), exclude_dir)]
+            for file in files:
+                if file.lower().endswith(('.tif', '.tiff')):
+                    scenes.append(os.path.join(root, file))
+    else:
+        scenes = [p for p in glob.glob(input_path, recursive=True) if p.lower().endswith(('.tif', '.tiff'))]
+    if exclude_dir:
+        scenes = [p for p in scenes if not _is_under(p, exclude_dir)]
+    return sorted(scenes)
+
+def input_root(input_path):
+    """Directory that scene names are taken relative to: the input directory, or the glob's fixed prefix"""
+    if os.path.isdir(input_path):
+        return input_path
+    parts = []
+    for part in os.path.normpath(input_path).split(os.sep):
+        if glob.has_magic(part):
+            return os.sep.join(parts) or '.'
+        parts.append(part)
+    return os.path.dirname(input_path) or '.'  # A single file
+
+def scene_key(scene_path, root):
+    """Scene name used for outputs and summaries: its path relative to the input root, without extension"""
+    relative = os.path.relpath(scene_path, root)
+    return os.path.splitext(relative)[0].replace(os.sep, '/')
+
+def scene_outputs(scene, output_dir):
+    """Paths of the mask GeoTIFF and per-tile CSV written for one scene, mirroring the input layout"""
+    scene_dir, scene_name = os.path.split(scene)
+    mask_path = os.path.join(output_dir, 'masks', scene_dir, f"{scene_name}_mask.tif")
+    tiles_path = os.path.join(output_dir, 'tiles', scene_dir, f"{scene_name}_tiles.csv")
+    return mask_path, tiles_path
+
+def is_done(scene, output_dir):
+    """A scene is complete once both of its outputs exist"""
+    return all(os.path.exists(p) for p in scene_outputs(scene, output_dir))
+
+def check_summary_format(summary_format):
+    """Fail before any prediction runs when the summary cannot be written"""
+    if summary_format == 'parquet':
+        try:
+            import pandas  # noqa: F401
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Parquet summaries require pandas and pyarrow: pip install pandas pyarrow")
+
+def _init_worker(model_path, tile_size, batch_size, cascade_bands, verify_cascade):
+    _worker['model'] = load_unet(model_path)
+    _worker['tile_size'] = tile_size
+    _worker['batch_size'] = batch_size
+    _worker['cascade_bands'] = cascade_bands
+    _worker['verify_cascade'] = verify_cascade
+
+def _optional_float(value):
+    return float(value) if value not in (None, '') else None
+
+def process_scene(scene_path, scene, output_dir):
+    """Predict one scene and write its mask GeoTIFF and per-tile CSV"""
+    mask_path, tiles_path = scene_outputs(scene, output_dir)
+    os.makedirs(os.path.dirname(mask_path), exist_ok=True)
+    os.makedirs(os.path.dirname(tiles_path), exist_ok=True)
+
+    mask, profile, tile_stats = predict_scene(
+        scene_path,
+        _worker['model'],
+        tile_size=_worker['tile_size'],
+        batch_size=_worker['batch_size'],
+        cascade_bands=_worker['cascade_bands'],
+        verify_cascade=_worker['verify_cascade']
+    )
+
+    # Write to temporary names first so an interrupted run never leaves outputs that look complete.
+    # The tile CSV is written last and marks the scene as done.
+    save_mask_geotiff(mask, profile, mask_path + '.part')
+    os.replace(mask_path + '.part', mask_path)
+
+    with open(tiles_path + '.part', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=TILE_FIELDS)
+        writer.writeheader()
+        for stats in tile_stats:
+            writer.writerow({'scene': scene, **stats})
+    os.replace(tiles_path + '.part', tiles_path)
+
+    return scene_path
+
+def build_summary(scenes, output_dir, summary_format='csv'):
+    """Collect per-tile results of all finished scenes (keys from scene_key) into scene and tile summaries"""
+    tile_rows = []
+    scene_rows = []
+    for scene in scenes:
+        _, tiles_path = scene_outputs(scene, output_dir)
+        if not os.path.exists(tiles_path):
+            continue
+        with open(tiles_path, newline='') as f:
+            rows = [{
+                'scene': row['scene'],
+                'tile_y': int(row['tile_y']),
+                'tile_x': int(row['tile_x']),
+                'tile_height': int(row['tile_height']),
+                'tile_width': int(row['tile_width']),
+                'water_percentage': float(row['water_percentage']),
+                'source': row.get('source') or 'unet',
+                'ndwi_water_percentage': _optional_float(row.get('ndwi_water_percentage')),
+                'agreement': _optional_float(row.get('agreement'))
+            } for row in csv.DictReader(f)]
+
+        water_pixels = 0.0
+        total_pixels = 0
+        for row in rows:
+            pixels = row['tile_height'] * row['tile_width']
+            water_pixels += row['water_percentage'] * pixels / 100
+            total_pixels += pixels
+        skipped = [row for row in rows if row['source'] == 'ndwi']
+        agreements = [row['agreement'] for row in skipped if row['agreement'] is not None]
+
+        tile_rows.extend(rows)
+        scene_rows.append({
+            'scene': scene,
+            'tiles': len(rows),
+            'water_percentage': (water_pixels / total_pixels) * 100 if total_pixels else 0.0,
+            'tiles_skipped_fraction': len(skipped) / len(rows) if rows else 0.0,
+            'cascade_agreement': sum(agreements) / len(agreements) if agreements else None
+        })
+
+    scene_summary = os.path.join(output_dir, f"scene_summary.{summary_format}")
+    tile_summary = os.path.join(output_dir, f"tile_summary.{summary_format}")
+
+    if summary_format == 'parquet':
+        import pandas as pd
+        pd.DataFrame(scene_rows, columns=SCENE_FIELDS).to_parquet(scene_summary, index=False)
+        pd.DataFrame(tile_rows, columns=TILE_FIELDS).to_parquet(tile_summary, index=False)
+    else:
+        for path, fields, rows in [(scene_summary, SCENE_FIELDS, scene_rows), (tile_summary, TILE_FIELDS, tile_rows)]:
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(rows)
+
+    return scene_summary, tile_summary, tile_rows
+
+def print_cascade_report(tile_rows):
+    """Report how many tiles the NDWI cascade skipped and how well it agreed with the U-Net"""
+    if not tile_rows:
+        return
+    skipped = [row for row in tile_rows if row['source'] == 'ndwi']
+    agreements = [row['agreement'] for row in skipped if row['agreement'] is not None]
+    print(f"Cascade: {len(skipped)}/{len(tile_rows)} tiles ({len(skipped) / len(tile_rows) * 100:.1f}%) "
+          f"accepted from NDWI without the U-Net")
+    if agreements:
+        print(f"Cascade: mean pixel agreement with full-model output on skipped tiles: "
+              f"{sum(agreements) / len(agreements):.2f}% (min {min(agreements):.2f}%)")
+
+def predict_batch(input_path, output_dir, model_path=DEFAULT_MODEL_PATH, workers=1,
+                  tile_size=256, batch_size=8, summary_format='csv', cascade_bands=None, verify_cascade=False):
+    """
+    Run U-Net predictions over every scene, skipping scenes that already have outputs.
+    cascade_bands=(land_max, water_min) accepts the NDWI mask for clearly land/water tiles,
+    see model.predict.predict_scene.
+    """
+    check_summary_format(summary_format)
+    os.makedirs(os.path.join(output_dir, 'masks'), exist_ok=True)
+    os.makedirs(os.path.join(output_dir, 'tiles'), exist_ok=True)
+
+    scene_paths = find_scenes(input_path, exclude_dir=output_dir)
+    if not scene_paths:
+        raise FileNotFoundError(f"No .tif/.tiff scenes found at: {input_path}")
+
+    root = input_root(input_path)
+    scenes = {}
+    for scene_path in scene_paths:
+        scene = scene_key(scene_path, root)
+        if scene in scenes:
+            raise ValueError(f"Scenes {scenes[scene]} and {scene_path} would write the same outputs")
+        scenes[scene] = scene_path
+
+    pending = [s for s in scenes if not is_done(s, output_dir)]
+    print(f"Found {len(scenes)} scenes, {len(scenes) - len(pending)} already done, {len(pending)} to predict.")
+
+    failed = []
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_path, tile_size, batch_size, cascade_bands, verify_cascade)) as pool:
+            futures = {pool.submit(process_scene, scenes[s], s, output_dir): scenes[s] for s in pending}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Predicting scenes"):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Error predicting {futures[future]}: {str(e)}")
+                    failed.append(futures[future])
+
+    scene_summary, tile_summary, tile_rows = build_summary(list(scenes), output_dir, summary_format)
+    print(f"\nPrediction complete! {len(scenes) - len(failed)}/{len(scenes)} scenes done.")
+    if cascade_bands is not None:
+        print_cascade_report(tile_rows)
+    print(f"Scene summary: {scene_summary}")
+    print(f"Tile summary: {tile_summary}")
+    return failed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Batch water body prediction over a directory or glob of TIFF scenes")
+    parser.add_argument('input', help="Directory of scenes or glob pattern, e.g. 'archive/**/*.tif'")
+    parser.add_argument('output_dir', help="Directory for mask GeoTIFFs and summaries")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help="Path to the trained U-Net (.h5)")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Number of worker processes")
+    parser.add_argument('--tile-size', type=int, default=256)
+    parser.add_argument('--batch-size', type=int, default=8, help="Tiles per U-Net batch")
+    parser.add_argument('--summary-format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--cascade', action='store_true',
+                        help="Accept the NDWI mask for clearly land/water tiles and run the U-Net only on the rest")
+    parser.add_argument('--land-max', type=float, default=2.0,
+                        help="Cascade: tiles with at most this NDWI water percentage are accepted as land")
+    parser.add_argument('--water-min', type=float, default=98.0,
+                        help="Cascade: tiles with at least this NDWI water percentage are accepted as water")
+    parser.add_argument('--verify-cascade', action='store_true',
+                        help="Also run the U-Net on skipped tiles and report agreement with the NDWI masks")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    failed = predict_batch(
+        args.input,
+        args.output_dir,
+        model_path=args.model,
+        workers=args.workers,
+        tile_size=args.tile_size,
+        batch_size=args.batch_size,
+        summary_format=args.summary_format,
+        cascade_bands=(args.land_max, args.water_min) if args.cascade else None,
+        verify_cascade=args.verify_cascade
+    )
+    raise SystemExit(1 if failed else 0)
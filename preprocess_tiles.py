@@ -1,33 +1,34 @@
 import os
 import shutil
 import numpy as np
-from PIL import Image
 from tqdm import tqdm
-from utils.tiler import tile_image
+from utils.tiler import tile_image, write_tile
 from utils.masker import create_water_mask
 
-def process_single_image(input_path, output_image_dir, output_mask_dir, tile_size=256):
-    """Process one image into multiple tiles with corresponding masks"""
+def process_single_image(input_path, output_image_dir, output_mask_dir, tile_size=256, tile_format='png',
+                         compression_level=None, compress='deflate', predictor=2):
+    """Process one image into multiple tiles with corresponding masks (tiles only when output_mask_dir is None)"""
     try:
         # Create temp directory for tiles
         temp_dir = "temp_tiles"
         os.makedirs(temp_dir, exist_ok=True)
         
         # Generate all tiles for this image
-        tile_paths = tile_image(input_path, tile_size, temp_dir)
+        tile_paths = tile_image(input_path, tile_size, temp_dir, tile_format=tile_format,
+                                compression_level=compression_level, compress=compress, predictor=predictor)
         
         # Process each tile
         for tile_path in tqdm(tile_paths, desc=f"Processing {os.path.basename(input_path)}"):
-            # Generate water mask
-            mask = create_water_mask(tile_path)
-            
             # Save to final directories
             base_name = os.path.basename(tile_path)
             final_image_path = os.path.join(output_image_dir, base_name)
-            final_mask_path = os.path.join(output_mask_dir, base_name)
-            
             os.rename(tile_path, final_image_path)
-            Image.fromarray(mask).save(final_mask_path)
+
+            # Generate water mask, unless the loader computes labels on the fly
+            if output_mask_dir:
+                mask = create_water_mask(final_image_path)
+                final_mask_path = os.path.join(output_mask_dir, base_name)
+                write_tile(mask, final_mask_path, compression_level=compression_level, compress=compress, predictor=predictor)
             
         shutil.rmtree(temp_dir)
         return len(tile_paths)
@@ -38,26 +39,34 @@ def process_single_image(input_path, output_image_dir, output_mask_dir, tile_siz
             shutil.rmtree(temp_dir)
         return 0
 
-def preprocess_dataset(input_dir, output_image_dir, output_mask_dir, tile_size=256):
-    """Process all images in input directory"""
+def preprocess_dataset(input_dir, output_image_dir, output_mask_dir, tile_size=256, tile_format='png',
+                       compression_level=None, compress='deflate', predictor=2):
+    """
+    Process all images in input directory
+    tile_format is one of utils.tiler.TILE_FORMATS (png, geotiff, webp, npy); masks use the same format
+    output_mask_dir=None writes only image tiles, for training with on-the-fly NDWI labels
+    """
     os.makedirs(output_image_dir, exist_ok=True)
-    os.makedirs(output_mask_dir, exist_ok=True)
+    if output_mask_dir:
+        os.makedirs(output_mask_dir, exist_ok=True)
     
     image_files = [f for f in os.listdir(input_dir) if f.lower().endswith(('.tif', '.tiff', '.png', '.jpg'))]
     total_tiles = 0
     
     for img_file in tqdm(image_files, desc="Processing dataset"):
         input_path = os.path.join(input_dir, img_file)
-        tiles_created = process_single_image(input_path, output_image_dir, output_mask_dir, tile_size)
+        tiles_created = process_single_image(input_path, output_image_dir, output_mask_dir, tile_size, tile_format,
+                                             compression_level, compress, predictor)
         total_tiles += tiles_created
     
-    print(f"\nPreprocessing complete! Created {total_tiles} tiles and masks.")
+    print(f"\nPreprocessing complete! Created {total_tiles} tiles{' and masks' if output_mask_dir else ''}.")
 
 if __name__ == '__main__':
     config = {
         'input_dir': 'raw_satellite_images',
         'output_image_dir': 'dataset/images_tiled',
         'output_mask_dir': 'dataset/masks_tiled',
-        'tile_size': 256
+        'tile_size': 256,
+        'tile_format': 'png'
     }
     preprocess_dataset(**config)
\ No newline at end of file
@@ -1,41 +1,49 @@
 import os
+import copy
+from collections import OrderedDict
 import numpy as np
 from PIL import Image
 from tensorflow.keras.utils import Sequence
-import rasterio
+from utils.tiler import read_tile, index_tiles, prepare_model_input, RAW_TILE_EXTENSIONS
+from utils.masker import create_water_mask_from_array
 
 class SatelliteDataLoader(Sequence):
-    def __init__(self, image_dir, mask_dir, batch_size=8, tile_size=256, shuffle=True):
+    """
+    Batches of (image, mask) tiles for training.
+    With mask_dir=None the masks are not read from disk but computed from each image
+    tile with the NDWI masker; label_cache_size > 0 keeps that many computed labels in an LRU cache.
+    """
+    def __init__(self, image_dir, mask_dir=None, batch_size=8, tile_size=256, shuffle=True,
+                 label_cache_size=0, ndwi_threshold=0.2):
         self.image_dir = image_dir
         self.mask_dir = mask_dir
         self.batch_size = batch_size
         self.tile_size = tile_size
         self.shuffle = shuffle
-        
-        # Verify directories exist
-        if image_dir and mask_dir:
+        self.label_cache_size = label_cache_size
+        self.ndwi_threshold = ndwi_threshold
+        self.label_cache = OrderedDict()
+
+        self.image_paths = []
+        self.mask_paths = []
+
+        if image_dir:
+            # Verify directories exist
             if not os.path.exists(image_dir):
                 raise FileNotFoundError(f"Image directory not found: {image_dir}")
-            if not os.path.exists(mask_dir):
+            if mask_dir and not os.path.exists(mask_dir):
                 raise FileNotFoundError(f"Mask directory not found: {mask_dir}")
-            
-            self.image_paths = sorted([
-                os.path.join(image_dir, f) for f in os.listdir(image_dir)
-                if f.endswith(('.png', '.jpg', '.tif'))
-            ])
-            self.mask_paths = sorted([
-                os.path.join(mask_dir, f) for f in os.listdir(mask_dir)
-                if f.endswith(('.png', '.jpg', '.tif'))
-            ])
-            
-            # Verify pairing
-            assert len(self.image_paths) == len(self.mask_paths), "Mismatched image/mask counts"
-            for img, msk in zip(self.image_paths, self.mask_paths):
-                assert os.path.basename(img) == os.path.basename(msk), f"Mismatched pairs: {img} vs {msk}"
-        else:
-            self.image_paths = []
-            self.mask_paths = []
-        
+
+            # Always a fresh listing here; split() and subsets reuse these paths instead of listing again
+            self.image_paths = index_tiles(image_dir)
+            if mask_dir:
+                # Pair by basename through a lookup instead of comparing two sorted listings
+                masks_by_name = {os.path.basename(p): p for p in index_tiles(mask_dir)}
+                missing = [p for p in self.image_paths if os.path.basename(p) not in masks_by_name]
+                if missing:
+                    raise ValueError(f"{len(missing)} images have no matching mask in {mask_dir}, e.g. {missing[0]}")
+                self.mask_paths = [masks_by_name[os.path.basename(p)] for p in self.image_paths]
+
         self.on_epoch_end()
 
     def __len__(self):
@@ -45,59 +53,75 @@ class SatelliteDataLoader(Sequence):
         start_idx = index * self.batch_size
         end_idx = (index + 1) * self.batch_size
         indices = range(start_idx, min(end_idx, len(self.image_paths)))
-        
+
         batch_images = []
         batch_masks = []
-        
+
         for i in indices:
-            # Load image
-            img = Image.open(self.image_paths[i])
-            img = img.resize((self.tile_size, self.tile_size))
-            img_array = np.array(img) / 255.0
-            
-            # Load mask
-            mask = Image.open(self.mask_paths[i]).convert('L')
-            mask = mask.resize((self.tile_size, self.tile_size))
-            mask_array = (np.array(mask) > 128).astype(np.float32)
-            
+            # Load image (any tile format written by utils.tiler)
+            raw = read_tile(self.image_paths[i])
+            img_array = prepare_model_input(raw, self.tile_size)  # Same bands and scaling as inference
+
+            # Load mask, or compute it from the image already in memory
+            if self.mask_dir:
+                mask = self._load_mask(self.mask_paths[i])
+            else:
+                mask = self._ndwi_label(self.image_paths[i], raw)
+            mask_array = mask.astype(np.float32)
+
             batch_images.append(img_array)
             batch_masks.append(np.expand_dims(mask_array, -1))
-        
+
         return np.array(batch_images), np.array(batch_masks)
 
+    def _load_mask(self, mask_path):
+        mask = read_tile(mask_path)
+        if mask.ndim == 3:
+            mask = mask[:, :, 0]
+        mask = Image.fromarray(mask).resize((self.tile_size, self.tile_size), Image.NEAREST)
+        return np.array(mask) > 128
+
+    def _ndwi_label(self, image_path, image):
+        """NDWI label for one tile, served from the LRU cache when possible"""
+        if image_path in self.label_cache:
+            self.label_cache.move_to_end(image_path)
+            return self.label_cache[image_path]
+
+        use_nir = image_path.lower().endswith(RAW_TILE_EXTENSIONS)
+        mask = create_water_mask_from_array(image, self.ndwi_threshold, use_nir=use_nir)
+        mask = np.array(Image.fromarray(mask).resize((self.tile_size, self.tile_size), Image.NEAREST)) > 128
+
+        if self.label_cache_size > 0:
+            self.label_cache[image_path] = mask
+            if len(self.label_cache) > self.label_cache_size:
+                self.label_cache.popitem(last=False)
+        return mask
+
     def on_epoch_end(self):
         if self.shuffle and len(self.image_paths) > 0:
-            combined = list(zip(self.image_paths, self.mask_paths))
-            np.random.shuffle(combined)
-            self.image_paths, self.mask_paths = zip(*combined)
+            if self.mask_paths:
+                combined = list(zip(self.image_paths, self.mask_paths))
+                np.random.shuffle(combined)
+                self.image_paths, self.mask_paths = map(list, zip(*combined))
+            else:
+                np.random.shuffle(self.image_paths)
+
+    def _subset(self, image_paths, mask_paths, shuffle):
+        # Shallow copy: shares settings and the label cache without listing the directories again
+        loader = copy.copy(self)
+        loader.image_paths = list(image_paths)
+        loader.mask_paths = list(mask_paths)
+        loader.shuffle = shuffle
+        return loader
 
     def split(self, val_ratio=0.2):
         """Split the dataset into training and validation sets"""
         if len(self.image_paths) == 0:
             raise ValueError("No images found to split")
-            
+
         split_idx = int(len(self.image_paths) * (1 - val_ratio))
-        
-        # Create new loader instances
-        train_loader = SatelliteDataLoader(
-            image_dir=self.image_dir,
-            mask_dir=self.mask_dir,
-            batch_size=self.batch_size,
-            tile_size=self.tile_size,
-            shuffle=self.shuffle
-        )
-        val_loader = SatelliteDataLoader(
-            image_dir=self.image_dir,
-            mask_dir=self.mask_dir,
-            batch_size=self.batch_size,
-            tile_size=self.tile_size,
-            shuffle=False
-        )
-        
-        # Manually set the paths
-        train_loader.image_paths = self.image_paths[:split_idx]
-        train_loader.mask_paths = self.mask_paths[:split_idx]
-        val_loader.image_paths = self.image_paths[split_idx:]
-        val_loader.mask_paths = self.mask_paths[split_idx:]
-        
-        return train_loader, val_loader
\ No newline at end of file
+
+        train_loader = self._subset(self.image_paths[:split_idx], self.mask_paths[:split_idx], self.shuffle)
+        val_loader = self._subset(self.image_paths[split_idx:], self.mask_paths[split_idx:], False)
+
+        return train_loader, val_loader
@@ -1,11 +1,34 @@
 import numpy as np
-from PIL import Image
-import rasterio
-import cv2
+from utils.tiler import read_tile, RAW_TILE_EXTENSIONS
 
 def calculate_ndwi(green_band, nir_band, epsilon=1e-6):
     """Calculate Normalized Difference Water Index"""
-    return (green_band.astype(float) - nir_band.astype(float)) / (green_band + nir_band + epsilon)
+    green = green_band.astype(float)  # Cast first: summing uint8 bands would wrap around
+    nir = nir_band.astype(float)
+    return (green - nir) / (green + nir + epsilon)
+
+def create_water_mask_from_array(image, ndwi_threshold=0.2, use_nir=True):
+    """
+    Create water mask from an (H, W, C) image array
+    Uses NDWI when a NIR band is available (use_nir and C >= 4), else the blue/green ratio
+    Returns binary mask (0=land, 255=water)
+    """
+    if image.ndim == 2:  # Grayscale
+        return np.zeros(image.shape, dtype=np.uint8)
+
+    if use_nir and image.shape[2] >= 4:  # Assume RGBN (Red, Green, Blue, NIR)
+        ndwi = calculate_ndwi(image[:,:,1], image[:,:,3])
+        mask = ((ndwi > ndwi_threshold) * 255).astype(np.uint8)
+    else:
+        blue = image[:,:,2].astype(float)
+        green = image[:,:,1].astype(float)
+        water_ratio = blue / (green + 1e-6)
+        mask = ((water_ratio > 1.1) * 255).astype(np.uint8)
+
+    # Post-processing to clean up small noise
+    import cv2  # Heavy import, deferred until the first mask is made
+    kernel = np.ones((3,3), np.uint8)
+    return cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, iterations=1)
 
 def create_water_mask(image_path, ndwi_threshold=0.2):
     """
@@ -13,40 +36,11 @@ def create_water_mask(image_path, ndwi_threshold=0.2):
     Returns binary mask (0=land, 255=water)
     """
     try:
-        # Handle multi-band GeoTIFFs
-        if image_path.lower().endswith(('.tif', '.tiff')):
-            with rasterio.open(image_path) as src:
-                # Try to get green and NIR bands
-                bands = src.count
-                if bands >= 4:  # Assume RGBN (Red, Green, Blue, NIR)
-                    green = src.read(2)
-                    nir = src.read(4)
-                    ndwi = calculate_ndwi(green, nir)
-                    mask = ((ndwi > ndwi_threshold) * 255).astype(np.uint8)
-                else:  # Fallback to RGB
-                    rgb = np.dstack([src.read(i) for i in range(1, min(4, bands)+1)])
-                    blue = rgb[:,:,2].astype(float)
-                    green = rgb[:,:,1].astype(float)
-                    water_ratio = blue / (green + 1e-6)
-                    mask = ((water_ratio > 1.1) * 255).astype(np.uint8)
-        
-        # Handle regular RGB images
-        else:
-            img = np.array(Image.open(image_path))
-            if len(img.shape) == 3:
-                blue = img[:,:,2].astype(float)
-                green = img[:,:,1].astype(float)
-                water_ratio = blue / (green + 1e-6)
-                mask = ((water_ratio > 1.1) * 255).astype(np.uint8)
-            else:  # Grayscale
-                mask = np.zeros_like(img)
-        
-        # Post-processing to clean up small noise
-        kernel = np.ones((3,3), np.uint8)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, iterations=1)
-        
-        return mask
+        # Multi-band GeoTIFF and .npy tiles keep the NIR band, regular RGB images fall back to the ratio
+        image = read_tile(image_path)
+        use_nir = image_path.lower().endswith(RAW_TILE_EXTENSIONS)
+        return create_water_mask_from_array(image, ndwi_threshold, use_nir=use_nir)
         
     except Exception as e:
         print(f"Error creating mask for {image_path}: {str(e)}")
-        return np.zeros((256, 256), dtype=np.uint8)  # Return blank mask on error
\ No newline at end of file
+        return np.zeros((256, 256), dtype=np.uint8)  # Return blank mask on error
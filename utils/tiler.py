@@ -1,33 +1,160 @@
 import os
 import numpy as np
 from PIL import Image
-import rasterio
-from rasterio.windows import Window
 
-def tile_image(image_path, tile_size, output_dir):
+# Tile output formats and the file extension each one is written with
+TILE_FORMATS = {
+    'png': '.png',
+    'geotiff': '.tif',
+    'webp': '.webp',
+    'npy': '.npy',
+}
+GEOTIFF_COMPRESSIONS = ('deflate', 'lzw', 'zstd', 'none')
+
+# Extensions that keep every band of the source (NIR included) at its original dtype
+RAW_TILE_EXTENSIONS = ('.tif', '.tiff', '.npy')
+TILE_EXTENSIONS = ('.png', '.jpg', '.tif', '.tiff', '.webp', '.npy')
+
+# Directory listings keyed by absolute path, for callers that opt in with use_cache=True
+_index_cache = {}
+
+def index_tiles(directory, use_cache=False):
+    """
+    Return the sorted tile paths of a directory in a single scandir pass.
+    use_cache=True reuses the last listing while the directory's mtime is unchanged. The mtime
+    only moves in steps of a few milliseconds, so files changed within one step can be missed:
+    only opt in for directories that are not being written to.
+    """
+    key = os.path.abspath(directory)
+    mtime = os.stat(key).st_mtime_ns
+    cached = _index_cache.get(key)
+    if not use_cache or cached is None or cached[0] != mtime:
+        with os.scandir(key) as entries:
+            paths = sorted(
+                os.path.join(directory, entry.name) for entry in entries
+                if entry.is_file() and entry.name.endswith(TILE_EXTENSIONS)
+            )
+        cached = _index_cache[key] = (mtime, paths)
+    return list(cached[1])
+
+def write_tile(tile, tile_path, compression_level=None, compress='deflate', predictor=2, crs=None, transform=None):
+    """
+    Write an (H, W) or (H, W, C) tile, choosing the encoder from the file extension.
+    - .png: compression_level 0-9 (PIL default when None)
+    - .tif: GeoTIFF with compress (deflate/lzw/zstd/none), predictor and compression_level
+            (deflate 1-9, zstd 1-22); internally tiled only above 256px; keeps crs/transform when given
+    - .webp: lossless WebP, compression_level 0-6 is the encoder effort; uint8 with 1/3/4 bands only
+             (single-band tiles read back as RGB)
+    - .npy: raw array, compression_level is ignored
+    """
+    ext = os.path.splitext(tile_path)[1].lower()
+    if tile.ndim == 3 and tile.shape[2] == 1:
+        tile = tile[:, :, 0]  # Single-band rasters arrive as (H, W, 1)
+
+    if ext in ('.tif', '.tiff'):
+        if compress not in GEOTIFF_COMPRESSIONS:
+            raise ValueError(f"Unsupported GeoTIFF compression: {compress}")
+        bands = tile[np.newaxis] if tile.ndim == 2 else np.moveaxis(tile, -1, 0)  # (H,W,C) → (C,H,W)
+        profile = {
+            'driver': 'GTiff',
+            'height': bands.shape[1],
+            'width': bands.shape[2],
+            'count': bands.shape[0],
+            'dtype': bands.dtype.name,
+        }
+        # Internal tiling only pays off beyond one block; smaller tiles would be padded out to 256x256
+        if bands.shape[1] > 256 or bands.shape[2] > 256:
+            profile.update(tiled=True, blockxsize=256, blockysize=256)
+        if crs is not None and transform is not None:
+            profile.update(crs=crs, transform=transform)
+        if compress != 'none':
+            profile.update(compress=compress, predictor=predictor)
+            if compression_level is not None and compress == 'deflate':
+                profile['zlevel'] = compression_level
+            elif compression_level is not None and compress == 'zstd':
+                profile['zstd_level'] = compression_level
+        import rasterio  # Heavy import, only needed for GeoTIFF tiles
+        with rasterio.open(tile_path, 'w', **profile) as dst:
+            dst.write(bands)
+
+    elif ext == '.npy':
+        np.save(tile_path, tile)
+
+    elif ext == '.webp':
+        if tile.dtype != np.uint8 or (tile.ndim == 3 and tile.shape[2] not in (3, 4)):
+            raise ValueError("Lossless WebP only holds 1-, 3- or 4-band uint8 tiles, use geotiff or npy instead")
+        method = 4 if compression_level is None else compression_level
+        Image.fromarray(tile).save(tile_path, lossless=True, quality=100, method=method)
+
+    else:
+        if compression_level is None:
+            Image.fromarray(tile).save(tile_path)
+        else:
+            Image.fromarray(tile).save(tile_path, compress_level=compression_level)
+
+    return tile_path
+
+def read_tile(tile_path):
+    """Read a tile written in any supported format as an (H, W) or (H, W, C) array"""
+    ext = os.path.splitext(tile_path)[1].lower()
+    if ext in ('.tif', '.tiff'):
+        import rasterio  # Heavy import, only needed for GeoTIFF tiles
+        with rasterio.open(tile_path) as src:
+            bands = src.read()
+        return bands[0] if bands.shape[0] == 1 else np.moveaxis(bands, 0, -1)  # (C,H,W) → (H,W,C)
+    if ext == '.npy':
+        return np.load(tile_path)
+    return np.array(Image.open(tile_path))
+
+def prepare_model_input(tile, size=256):
+    """
+    Turn an (H, W) or (H, W, C) tile into the (size, size, 3) float32 U-Net input.
+    Takes the first three bands as RGB and scales integer dtypes by their full range
+    (uint8 by 255, uint16 by 65535). Training and inference must both go through here.
+    """
+    import cv2  # Heavy import, deferred until the first tile is prepared
+    if tile.ndim == 2:
+        tile = tile[:, :, np.newaxis]
+    if tile.shape[2] < 3:
+        tile = np.repeat(tile[:, :, :1], 3, axis=2)
+    scale = np.iinfo(tile.dtype).max if np.issubdtype(tile.dtype, np.integer) else 1.0
+    rgb = tile[:, :, :3].astype(np.float32) / scale
+    return cv2.resize(rgb, (size, size), interpolation=cv2.INTER_LINEAR)
+
+def tile_image(image_path, tile_size, output_dir, tile_format='png', compression_level=None,
+               compress='deflate', predictor=2):
     """Splits an image into multiple tiles. Returns paths to all tiles."""
+    if tile_format not in TILE_FORMATS:
+        raise ValueError(f"Unsupported tile format: {tile_format} (choose from {', '.join(TILE_FORMATS)})")
     os.makedirs(output_dir, exist_ok=True)
     tile_paths = []
-    
+    ext = TILE_FORMATS[tile_format]
+    write_options = {'compression_level': compression_level, 'compress': compress, 'predictor': predictor}
+
     if image_path.endswith(('.tif', '.tiff')):
+        import rasterio  # Heavy import, only needed for GeoTIFF sources
+        from rasterio.windows import Window
         with rasterio.open(image_path) as src:
             for y in range(0, src.height, tile_size):
                 for x in range(0, src.width, tile_size):
                     window = Window(x, y, tile_size, tile_size)
                     tile = src.read(window=window)
                     tile = np.moveaxis(tile, 0, -1)  # (C,H,W) → (H,W,C)
-                    tile_name = f"{os.path.splitext(os.path.basename(image_path))[0]}_{y}_{x}.png"
+                    tile_name = f"{os.path.splitext(os.path.basename(image_path))[0]}_{y}_{x}{ext}"
                     tile_path = os.path.join(output_dir, tile_name)
-                    Image.fromarray(tile).save(tile_path)
+                    write_tile(tile, tile_path, crs=src.crs, transform=src.window_transform(window), **write_options)
                     tile_paths.append(tile_path)
     else:
         img = Image.open(image_path)
         for y in range(0, img.height, tile_size):
             for x in range(0, img.width, tile_size):
                 tile = img.crop((x, y, x+tile_size, y+tile_size))
-                tile_name = f"{os.path.splitext(os.path.basename(image_path))[0]}_{y}_{x}.png"
+                tile_name = f"{os.path.splitext(os.path.basename(image_path))[0]}_{y}_{x}{ext}"
                 tile_path = os.path.join(output_dir, tile_name)
-                tile.save(tile_path)
+                if tile_format == 'png' and compression_level is None:
+                    tile.save(tile_path)
+                else:
+                    write_tile(np.array(tile), tile_path, **write_options)
                 tile_paths.append(tile_path)
-    
-    return tile_paths  # Returns list of ALL generated tiles
\ No newline at end of file
+
+    return tile_paths  # Returns list of ALL generated tiles